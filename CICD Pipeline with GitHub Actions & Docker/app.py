@@ -1,74 +1,461 @@
-from flask import Flask, jsonify, request, render_template_string
-from functools import wraps
+from flask import Flask, Response, after_this_request, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_compress import Compress
+from markupsafe import Markup, escape
+from functools import lru_cache, wraps
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import brotli
+import fcntl
+import hmac
 import logging
+import queue
 from datetime import datetime
 import os
-import json
+import re
+import gzip
+import hashlib
+import time
+import orjson
+from store import create_store
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson instead of the stdlib encoder
+
+    Dates are passed through to Flask's default, so they are still written
+    as HTTP dates rather than orjson's ISO 8601. orjson only indents by two
+    spaces, so any indent gives two.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+# Keys are emitted in insertion order; orjson always writes UTF-8, never \u escapes
+app.json.sort_keys = False
+# Trust X-Forwarded-For/-Proto only from this many proxies in front of the app;
+# with none (the default) a client could set them to spoof its address and scheme
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['DEBUG'] = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+# Stylesheets under /static are cached by browsers for a year
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+# Text responses of 500 bytes or more are compressed, Brotli preferred
+app.config['COMPRESS_MIN_SIZE'] = 500
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+# Files under /static are sent as streams; allow gzip there too for clients without Brotli
+app.config['COMPRESS_ALGORITHM_STREAMING'] = ['br', 'gzip']
+Compress(app)
+ENVIRONMENT = os.environ.get('ENVIRONMENT', 'development')
+API_VERSION = '1.0.0'
+# Longest accepted user name and email (an email address is at most 254 characters)
+MAX_NAME_LENGTH = 100
+MAX_EMAIL_LENGTH = 254
+
+class RecordQueueHandler(QueueHandler):
+    """Queue handler that puts records on the queue untouched
+
+    The stock prepare() formats and copies every record on the calling
+    thread so it can be pickled to another process. The listener here is a
+    thread in the same process, so it can do all the formatting itself.
+    """
+
+    def prepare(self, record):
+        return record
+
+# Setup logging: requests only queue their records, a listener thread formats and writes them
+_log_queue = queue.SimpleQueue()
+_log_output = logging.StreamHandler()
+_log_output.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+logging.root.addHandler(RecordQueueHandler(_log_queue))
+logging.root.setLevel(logging.INFO)
+
+def start_log_listener():
+    listener = QueueListener(_log_queue, _log_output)
+    listener.start()
+    atexit.register(listener.stop)
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+start_log_listener()
+# Threads do not survive a fork, so preloaded gunicorn workers start their own listener
+os.register_at_fork(after_in_child=start_log_listener)
 logger = logging.getLogger(__name__)
 
-# In-memory data store (use Redis/PostgreSQL in production)
-data_store = {
-    'visits': 0,
-    'users': [],
-    'messages': []
-}
+# Data store: in-memory by default, shared through Redis when REDIS_URL is set
+store = create_store(os.environ.get('REDIS_URL'))
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 2))
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 300))
+# When set, the users page is also written here as users.html after every user write
+STATIC_PAGE_DIR = os.environ.get('STATIC_PAGE_DIR')
+
+# Current UTC time as [epoch second, display string, ISO 8601 string]
+_clock = [0, '', '']
+
+def utc_now_strings():
+    """Return (display, ISO 8601) strings for the current UTC second, formatting at most once per second"""
+    now = int(time.time())
+    if now != _clock[0]:
+        t = time.gmtime(now)
+        _clock[:] = [now, time.strftime('%Y-%m-%d %H:%M:%S', t), time.strftime('%Y-%m-%dT%H:%M:%S', t)]
+    return _clock[1], _clock[2]
+
+# Recently rendered counter values, as ASCII bytes
+_int_bytes_cache = {}
+
+def int_bytes(n):
+    b = _int_bytes_cache.get(n)
+    if b is None:
+        if len(_int_bytes_cache) >= 1024:
+            _int_bytes_cache.clear()
+        b = _int_bytes_cache[n] = str(n).encode('ascii')
+    return b
+
+# Rendered collection pages as {collection: (revision, body, etag)}
+_versioned_pages = {}
+
+def versioned_body(collection, render):
+    """Return (revision, body, etag) for a collection page, rendering it again only after the collection changed
+
+    The revision is read before the data, so a stored body is never older
+    than the revision it is filed under. The ETag is a hash of the body,
+    not the revision, because revisions start over when a process restarts
+    or Redis is flushed.
+    """
+    rev = store.get_revision(collection)
+    entry = _versioned_pages.get(collection)
+    if entry is None or entry[0] != rev or app.jinja_env.auto_reload:
+        body = ''.join(render()).encode()
+        entry = _versioned_pages[collection] = (rev, body, hashlib.sha1(body).hexdigest())
+    return entry
+
+def stream_and_store(collection, rev, chunks):
+    """Yield a page's chunks as bytes, then file the whole body under rev in _versioned_pages
+
+    A render that a newer one has already replaced is not stored.
+    """
+    parts = []
+    for chunk in chunks:
+        part = chunk.encode()
+        parts.append(part)
+        yield part
+    entry = _versioned_pages.get(collection)
+    if entry is None or entry[0] <= rev:
+        body = b''.join(parts)
+        _versioned_pages[collection] = (rev, body, hashlib.sha1(body).hexdigest())
+
+# Compressed page bodies as {(body key, content coding): bytes}
+_compressed_bodies = {}
+
+def compressed_response(body, key):
+    """Serve a cached HTML body, compressing it at most once per content coding
+
+    key must change whenever the body does (a hash of it). Flask-Compress
+    leaves responses that already carry a Content-Encoding alone, so cached
+    pages are not compressed again on every request.
+    """
+    response = Response(mimetype='text/html')
+    response.vary.add('Accept-Encoding')
+    coding = None
+    if len(body) >= app.config['COMPRESS_MIN_SIZE']:
+        if request.accept_encodings['br'] > 0:
+            coding = 'br'
+        elif request.accept_encodings['gzip'] > 0:
+            coding = 'gzip'
+    if coding is None:
+        response.set_data(body)
+        return response
+    data = _compressed_bodies.get((key, coding))
+    if data is None:
+        if len(_compressed_bodies) >= 256:
+            _compressed_bodies.clear()
+        if coding == 'br':
+            data = brotli.compress(body, quality=app.config['COMPRESS_BR_LEVEL'])
+        else:
+            data = gzip.compress(body, app.config['COMPRESS_LEVEL'])
+        _compressed_bodies[key, coding] = data
+    response.set_data(data)
+    response.headers['Content-Encoding'] = coding
+    return response
+
+def versioned_page(collection, render):
+    """Serve a collection page tagged with its ETag, so a client that already has it gets an empty 304
+
+    After the collection changed, the new page is streamed as it renders and
+    filed once complete; that first response has no ETag, since the hash is
+    only known at the end.
+    """
+    rev = store.get_revision(collection)
+    entry = _versioned_pages.get(collection)
+    if entry is None or entry[0] != rev or app.jinja_env.auto_reload:
+        return Response(stream_and_store(collection, rev, render()), mimetype='text/html')
+    _, body, etag = entry
+    response = compressed_response(body, etag)
+    # Each content coding is a different representation, so it gets its own tag
+    response.set_etag(f'{etag}:{response.content_encoding}' if response.content_encoding else etag)
+    return response.make_conditional(request)
+
+# Pages rendered from templates without variables, as {template name: (body, hash)}
+_static_pages = {}
+
+def static_page(name):
+    """Serve a template that takes no variables, rendering it only once"""
+    entry = _static_pages.get(name)
+    if entry is None or app.jinja_env.auto_reload:
+        body = page_template(name).render().encode()
+        entry = _static_pages[name] = (body, hashlib.sha1(body).digest())
+    return compressed_response(*entry)
+
+def publish_page(collection, render, force=False):
+    """Write the current collection page to STATIC_PAGE_DIR for a front proxy to serve
+
+    The file is written next to its final name and swapped in with
+    os.replace, so readers see either the old page or the new one. Writers
+    take an exclusive lock on <collection>.html.rev, which holds the
+    revision on disk, so a worker that rendered an older revision never
+    puts it back over a newer page. force skips that check; it is used at
+    startup, when in-memory revisions start over.
+
+    The data change has already succeeded by the time this runs, so a
+    failed write is logged rather than raised.
+    """
+    path = os.path.join(STATIC_PAGE_DIR, f'{collection}.html')
+    rev, body, _ = versioned_body(collection, render)
+    try:
+        with open(f'{path}.rev', 'a+') as rev_file:
+            fcntl.flock(rev_file, fcntl.LOCK_EX)
+            rev_file.seek(0)
+            published = rev_file.read()
+            if not force and published.isdigit() and int(published) >= rev:
+                return
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+            rev_file.truncate(0)
+            rev_file.write(str(rev))
+    except OSError:
+        logger.exception("Could not publish the %s page to %s", collection, STATIC_PAGE_DIR)
+
+def vary_on_accept(response):
+    response.vary.add('Accept')
+    return response
+
+def wants_json():
+    """Whether the client asked for JSON; the response is marked Vary: Accept either way
+
+    Routes that call this serve HTML or JSON from the same URL, so shared
+    caches must keep the two apart.
+    """
+    after_this_request(vary_on_accept)
+    return 'application/json' in request.headers.get('Accept', '')
+
+def cached_page(name, render):
+    """Serve a page from the page cache, rendering it on a miss
+
+    Clients that accept gzip get a body compressed once per cache fill.
+    """
+    gzipped = request.accept_encodings['gzip'] > 0
+    key = f'page:{name}:gz' if gzipped else f'page:{name}'
+    body = store.cache_get(key)
+    if body is None:
+        body = render()
+        if gzipped:
+            body = gzip.compress(body, 6)
+        store.cache_set(key, body, PAGE_CACHE_TTL)
+    response = Response(body, mimetype='text/html')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
 
 # Middleware - Request logging
 @app.before_request
 def log_request():
-    logger.info(f"{request.method} {request.path} from {request.remote_addr}")
-    data_store['visits'] += 1
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("%s %s from %s", request.method, request.path, request.environ.get('REMOTE_ADDR', '-'))
+    store.incr_visits()
 
 # Middleware - Response headers
+SECURITY_HEADERS = [
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'DENY'),
+    ('X-XSS-Protection', '1; mode=block'),
+    # CORS headers
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, X-API-Key')
+]
+
 @app.after_request
 def add_security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    # CORS headers
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-API-Key'
+    response.headers.extend(SECURITY_HEADERS)
     return response
 
+def json_response(obj, status=200):
+    """Encode straight to bytes with orjson, skipping jsonify's str round trip"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({'error': 'Resource not found', 'status': 404}), 404
+    return json_response({'error': 'Resource not found', 'status': 404}, 404)
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"Internal error: {error}")
-    return jsonify({'error': 'Internal server error', 'status': 500}), 500
+    logger.error("Internal error: %s", error)
+    return json_response({'error': 'Internal server error', 'status': 500}, 500)
 
 # Decorator for API key authentication
+VALID_API_KEY = os.environ.get('API_KEY', 'demo-api-key').encode()
+INVALID_API_KEY_BODY = orjson.dumps({'error': 'Invalid or missing API key'})
+
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        api_key = request.headers.get('X-API-Key')
-        valid_key = os.environ.get('API_KEY', 'demo-api-key')
-        if api_key != valid_key:
-            return jsonify({'error': 'Invalid or missing API key'}), 401
+        api_key = request.headers.get('X-API-Key', '').encode()
+        if not hmac.compare_digest(api_key, VALID_API_KEY):
+            return Response(INVALID_API_KEY_BODY, status=401, mimetype='application/json')
         return f(*args, **kwargs)
     return decorated_function
 
+# Page templates, compiled once at import and rendered directly
+PAGE_TEMPLATES = {name: app.jinja_env.get_template(name) for name in [
+    'users.html',
+    'users_empty.html',
+    'user_detail.html',
+    'user_not_found.html',
+    'messages.html',
+    'messages_empty.html',
+    'search.html',
+    'search_results.html',
+    'search_results_empty.html',
+    'search_card.html'
+]}
+
+def page_template(name):
+    """Return a compiled page template, going through the loader only when templates auto-reload (debug)"""
+    if app.jinja_env.auto_reload:
+        return app.jinja_env.get_template(name)
+    return PAGE_TEMPLATES[name]
+
+def static_file_version(filename):
+    # str(): names built in templates arrive as Markup, which would escape the folder path
+    with open(os.path.join(app.static_folder, str(filename)), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:8]
+
+# Content hashes of the files under static/, taken once at import
+STATIC_VERSIONS = {
+    filename: static_file_version(filename)
+    for filename in (
+        os.path.relpath(os.path.join(root, name), app.static_folder)
+        for root, _, names in os.walk(app.static_folder) for name in names
+    )
+}
+
+def static_url(filename):
+    """URL of a file under static/ carrying a hash of its content
+
+    Static files are cached for a year, so an edited file must get a new URL
+    for browsers to fetch it. The hash is taken again on every call while
+    templates auto-reload (debug).
+    """
+    if app.jinja_env.auto_reload:
+        return f'/static/{filename}?v={static_file_version(filename)}'
+    return f'/static/{filename}?v={STATIC_VERSIONS[filename]}'
+
+app.jinja_env.globals['static_url'] = static_url
+
+@lru_cache(maxsize=4096)
+def cached_search_card(user_id, name, email):
+    """Return a user's search result card, rendered once per user
+
+    User ids are never reused and the card's values are part of the key,
+    so a cached card cannot go stale.
+    """
+    return Markup(page_template('search_card.html').render(name=name, email=email, initial=name[:1].upper()))
+
+def search_card(user_id, name, email):
+    """Search result card, rendered fresh while templates auto-reload (debug) so template edits show"""
+    if app.jinja_env.auto_reload:
+        return cached_search_card.__wrapped__(user_id, name, email)
+    return cached_search_card(user_id, name, email)
+
+def with_display_fields(record, name):
+    """Copy of a user or message record with the values its page shows
+
+    These are derived for rendering only, so they never reach the stored
+    records or the JSON API. Collection pages are rendered once per write,
+    so this runs once per record per write, not per request.
+    """
+    created_at = record['created_at']
+    return {
+        **record,
+        'initial': name[:1].upper(),
+        'date_short': created_at[:10],
+        'date_long': created_at[:19].replace('T', ' ')
+    }
+
+app.jinja_env.globals['search_card'] = search_card
+
+# Listing pages have an *_empty.html variant that replaces the listing block,
+# so neither template branches on whether there is anything to list
+def listing_template(name, items):
+    return page_template(f'{name}.html' if items else f'{name}_empty.html')
+
+def render_listing(name, key, items, **context):
+    return listing_template(name, items).render({key: items}, **context)
+
+def stream_listing(name, key, items, **context):
+    """Render a listing page in chunks of 50 template events
+
+    The items are loaded before this is called and the templates never read
+    the request, so the stream can outlive the request context.
+    """
+    stream = listing_template(name, items).stream({key: items}, **context)
+    stream.enable_buffering(50)
+    return stream
+
+def render_users_page():
+    return stream_listing('users', 'users', [with_display_fields(u, u['name']) for u in store.list_users()])
+
+def render_messages_page():
+    return stream_listing('messages', 'messages', [with_display_fields(m, m['author']) for m in store.list_messages()])
+
+def minify_css(css):
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r' ?([{};,]) ?', r'\1', css)
+    # Only declarations have ": " here; no selector puts a space before a pseudo-class
+    return css.replace(': ', ':').replace(';}', '}').strip()
+
+_STYLE_BLOCK = re.compile(r'(<style>)(.*?)(</style>)', re.S)
+_INDENT = re.compile(r'^[ \t]+', re.M)
+
+def page_shell(html):
+    """Encode a page fragment once at import, minifying its <style> block and dropping line indentation
+
+    Newlines are kept, so the whitespace between elements still renders the same.
+    """
+    html = _STYLE_BLOCK.sub(lambda m: m[1] + minify_css(m[2]) + m[3], html)
+    return _INDENT.sub('', html).encode('utf-8')
+
 # Routes
-@app.route('/')
-def home():
-    html = """
+# Pre-encoded page shells, split where live values are spliced in
+HOME_HTML_PREFIX = page_shell("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -311,15 +698,21 @@ def home():
             <div class="stats-grid" id="stats">
                 <div class="stat-card">
                     <div class="stat-label">Total Visits</div>
-                    <div class="stat-value" id="visits">""" + str(data_store['visits']) + """</div>
+                    <div class="stat-value" id="visits">""")
+
+HOME_HTML_MID_USERS = page_shell("""</div>
                 </div>
                 <div class="stat-card">
                     <div class="stat-label">Users</div>
-                    <div class="stat-value" id="users">""" + str(len(data_store['users'])) + """</div>
+                    <div class="stat-value" id="users">""")
+
+HOME_HTML_MID_MESSAGES = page_shell("""</div>
                 </div>
                 <div class="stat-card">
                     <div class="stat-label">Messages</div>
-                    <div class="stat-value" id="messages">""" + str(len(data_store['messages'])) + """</div>
+                    <div class="stat-value" id="messages">""")
+
+HOME_HTML_SUFFIX = page_shell("""</div>
                 </div>
             </div>
             
@@ -412,13 +805,25 @@ def home():
         </div>
     </body>
     </html>
-    """
-    return render_template_string(html)
+    """)
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Health check endpoint for monitoring"""
-    html = """
+def render_home():
+    visits, users, messages = store.get_counts()
+    return b''.join([
+        HOME_HTML_PREFIX,
+        int_bytes(visits),
+        HOME_HTML_MID_USERS,
+        int_bytes(users),
+        HOME_HTML_MID_MESSAGES,
+        int_bytes(messages),
+        HOME_HTML_SUFFIX
+    ])
+
+@app.route('/')
+def home():
+    return cached_page('home', render_home)
+
+HEALTH_HTML_PREFIX = page_shell("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -531,32 +936,52 @@ def health_check():
             <a href="/" class="back-btn">← Back to Home</a>
         </div>
         <script>
-            const data = """ + json.dumps({
-                'status': 'healthy',
-                'timestamp': datetime.utcnow().isoformat(),
-                'version': '1.0.0',
-                'environment': os.environ.get('ENVIRONMENT', 'development')
-            }) + """;
+            const data = """)
+
+HEALTH_HTML_SUFFIX = page_shell(""";
             const grid = document.getElementById('healthData');
             Object.keys(data).forEach(key => {
                 const item = document.createElement('div');
                 item.className = 'info-item';
-                item.innerHTML = `
-                    <span class="info-label">${key.toUpperCase()}</span>
-                    <span class="info-value">${data[key]}</span>
-                `;
+                const label = document.createElement('span');
+                label.className = 'info-label';
+                label.textContent = key.toUpperCase();
+                const value = document.createElement('span');
+                value.className = 'info-value';
+                value.textContent = data[key];
+                item.append(label, value);
                 grid.appendChild(item);
             });
         </script>
     </body>
     </html>
-    """
-    return render_template_string(html)
+    """)
 
-@app.route('/api/stats', methods=['GET'])
-def get_stats():
-    """Get application statistics"""
-    html = """
+# Body for probes that ask for JSON (load balancers, Kubernetes)
+HEALTH_JSON = orjson.dumps({
+    'status': 'healthy',
+    'version': API_VERSION,
+    'environment': ENVIRONMENT
+})
+
+def render_health():
+    data = orjson.dumps({
+        'status': 'healthy',
+        'timestamp': utc_now_strings()[1],
+        'version': API_VERSION,
+        'environment': ENVIRONMENT
+    })
+    # "<\/" is the same string to JSON but cannot close the <script> element
+    return b''.join([HEALTH_HTML_PREFIX, data.replace(b'</', b'<\\/'), HEALTH_HTML_SUFFIX])
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Health check endpoint for monitoring"""
+    if wants_json():
+        return Response(HEALTH_JSON, mimetype='application/json')
+    return cached_page('health', render_health)
+
+STATS_HTML_PREFIX = page_shell("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -712,17 +1137,23 @@ def get_stats():
                 <div class="stat-card">
                     <div class="stat-icon">👥</div>
                     <div class="stat-label">Total Users</div>
-                    <div class="stat-value">""" + str(len(data_store['users'])) + """</div>
+                    <div class="stat-value">""")
+
+STATS_HTML_MID_MESSAGES = page_shell("""</div>
                 </div>
                 <div class="stat-card">
                     <div class="stat-icon">💬</div>
                     <div class="stat-label">Messages</div>
-                    <div class="stat-value">""" + str(len(data_store['messages'])) + """</div>
+                    <div class="stat-value">""")
+
+STATS_HTML_MID_VISITS = page_shell("""</div>
                 </div>
                 <div class="stat-card">
                     <div class="stat-icon">👁️</div>
                     <div class="stat-label">Total Visits</div>
-                    <div class="stat-value">""" + str(data_store['visits']) + """</div>
+                    <div class="stat-value">""")
+
+STATS_HTML_MID_TIME = page_shell("""</div>
                 </div>
             </div>
             <div class="details-card">
@@ -730,15 +1161,19 @@ def get_stats():
                 <div class="details-grid">
                     <div class="detail-item">
                         <span class="detail-label">Current Time (UTC)</span>
-                        <span class="detail-value">""" + datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S') + """</span>
+                        <span class="detail-value">""")
+
+STATS_HTML_MID_ENVIRONMENT = page_shell("""</span>
                     </div>
                     <div class="detail-item">
                         <span class="detail-label">Environment</span>
-                        <span class="detail-value">""" + os.environ.get('ENVIRONMENT', 'development') + """</span>
+                        <span class="detail-value">""")
+
+STATS_HTML_SUFFIX = page_shell(f"""</span>
                     </div>
                     <div class="detail-item">
                         <span class="detail-label">API Version</span>
-                        <span class="detail-value">1.0.0</span>
+                        <span class="detail-value">{escape(API_VERSION)}</span>
                     </div>
                 </div>
                 <a href="/" class="back-btn">← Back to Home</a>
@@ -746,969 +1181,140 @@ def get_stats():
         </div>
     </body>
     </html>
-    """
-    return render_template_string(html)
+    """)
+
+# The environment name is HTML-escaped once, not on every render
+ENVIRONMENT_HTML = str(escape(ENVIRONMENT)).encode('utf-8')
+
+def render_stats():
+    visits, users, messages = store.get_counts()
+    return b''.join([
+        STATS_HTML_PREFIX,
+        int_bytes(users),
+        STATS_HTML_MID_MESSAGES,
+        int_bytes(messages),
+        STATS_HTML_MID_VISITS,
+        int_bytes(visits),
+        STATS_HTML_MID_TIME,
+        utc_now_strings()[0].encode(),
+        STATS_HTML_MID_ENVIRONMENT,
+        ENVIRONMENT_HTML,
+        STATS_HTML_SUFFIX
+    ])
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Get application statistics"""
+    return cached_page('stats', render_stats)
 
 @app.route('/api/users', methods=['GET', 'POST'])
 def users():
     """User management endpoint"""
+    if request.method == 'GET' and wants_json():
+        return Response(store.users_json(), mimetype='application/json')
+
     if request.method == 'GET':
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Users</title>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                * { margin: 0; padding: 0; box-sizing: border-box; }
-                body {
-                    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    min-height: 100vh;
-                    padding: 40px 20px;
-                }
-                .container {
-                    max-width: 1200px;
-                    margin: 0 auto;
-                }
-                .header {
-                    text-align: center;
-                    color: white;
-                    margin-bottom: 50px;
-                    animation: fadeInDown 0.6s ease;
-                }
-                h1 {
-                    font-size: 48px;
-                    font-weight: 700;
-                    margin-bottom: 10px;
-                }
-                .subtitle {
-                    font-size: 18px;
-                    opacity: 0.95;
-                }
-                .action-bar {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 30px;
-                    flex-wrap: wrap;
-                    gap: 15px;
-                    animation: fadeInUp 0.6s ease 0.2s both;
-                }
-                .user-count {
-                    background: rgba(255,255,255,0.2);
-                    padding: 12px 25px;
-                    border-radius: 12px;
-                    color: white;
-                    font-weight: 600;
-                    backdrop-filter: blur(10px);
-                }
-                .add-btn {
-                    padding: 12px 30px;
-                    background: white;
-                    color: #667eea;
-                    border: none;
-                    border-radius: 12px;
-                    font-weight: 600;
-                    cursor: pointer;
-                    transition: all 0.3s ease;
-                    text-decoration: none;
-                    display: inline-block;
-                }
-                .add-btn:hover {
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-                }
-                .users-grid {
-                    display: grid;
-                    grid-template-columns: repeat(auto-fill, minmax(320px, 1fr));
-                    gap: 25px;
-                    animation: fadeInUp 0.6s ease 0.4s both;
-                }
-                .user-card {
-                    background: rgba(255,255,255,0.95);
-                    padding: 30px;
-                    border-radius: 20px;
-                    box-shadow: 0 10px 40px rgba(0,0,0,0.15);
-                    transition: transform 0.3s ease;
-                    position: relative;
-                }
-                .user-card:hover {
-                    transform: translateY(-5px);
-                }
-                .user-avatar {
-                    width: 70px;
-                    height: 70px;
-                    background: linear-gradient(135deg, #667eea, #764ba2);
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    color: white;
-                    font-size: 28px;
-                    font-weight: 700;
-                    margin-bottom: 20px;
-                }
-                .user-name {
-                    color: #2d3748;
-                    font-size: 22px;
-                    font-weight: 700;
-                    margin-bottom: 8px;
-                }
-                .user-email {
-                    color: #718096;
-                    font-size: 14px;
-                    margin-bottom: 15px;
-                }
-                .user-meta {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    padding-top: 15px;
-                    border-top: 1px solid #e2e8f0;
-                }
-                .user-id {
-                    color: #a0aec0;
-                    font-size: 13px;
-                    font-weight: 600;
-                }
-                .user-date {
-                    color: #a0aec0;
-                    font-size: 12px;
-                }
-                .empty-state {
-                    text-align: center;
-                    padding: 80px 20px;
-                    background: rgba(255,255,255,0.95);
-                    border-radius: 20px;
-                    animation: fadeInUp 0.6s ease 0.4s both;
-                }
-                .empty-icon {
-                    font-size: 80px;
-                    margin-bottom: 20px;
-                    opacity: 0.5;
-                }
-                .empty-text {
-                    color: #4a5568;
-                    font-size: 18px;
-                    margin-bottom: 30px;
-                }
-                .back-btn {
-                    margin-top: 30px;
-                    display: inline-block;
-                    padding: 14px 35px;
-                    background: white;
-                    color: #667eea;
-                    text-decoration: none;
-                    border-radius: 12px;
-                    font-weight: 600;
-                    transition: all 0.3s ease;
-                }
-                .back-btn:hover {
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 30px rgba(0,0,0,0.15);
-                }
-                @keyframes fadeInDown {
-                    from { opacity: 0; transform: translateY(-30px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-                @keyframes fadeInUp {
-                    from { opacity: 0; transform: translateY(30px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>👥 Users</h1>
-                    <p class="subtitle">Manage all registered users</p>
-                </div>
-                <div class="action-bar">
-                    <div class="user-count">Total Users: """ + str(len(data_store['users'])) + """</div>
-                    <a href="/" class="back-btn">← Back to Home</a>
-                </div>
-                """ + ("""
-                <div class="users-grid">
-                """ + ''.join([f"""
-                    <div class="user-card">
-                        <div class="user-avatar">{user['name'][0].upper()}</div>
-                        <div class="user-name">{user['name']}</div>
-                        <div class="user-email">{user['email']}</div>
-                        <div class="user-meta">
-                            <span class="user-id">ID: {user['id']}</span>
-                            <span class="user-date">{user['created_at'][:10]}</span>
-                        </div>
-                    </div>
-                """ for user in data_store['users']]) + """
-                </div>
-                """ if data_store['users'] else """
-                <div class="empty-state">
-                    <div class="empty-icon">📭</div>
-                    <div class="empty-text">No users yet</div>
-                    <p style="color: #718096;">Create your first user using the POST /api/users endpoint</p>
-                </div>
-                """) + """
-            </div>
-        </body>
-        </html>
-        """
-        return render_template_string(html)
+        return versioned_page('users', render_users_page)
     
     elif request.method == 'POST':
         data = request.get_json()
         
         if not data or 'name' not in data or 'email' not in data:
-            return jsonify({'error': 'Name and email are required'}), 400
+            return json_response({'error': 'Name and email are required'}, 400)
+
+        if not isinstance(data['name'], str) or not isinstance(data['email'], str):
+            return json_response({'error': 'Name and email must be strings'}, 400)
+
+        if len(data['name']) > MAX_NAME_LENGTH or len(data['email']) > MAX_EMAIL_LENGTH:
+            return json_response({'error': f'Name must be at most {MAX_NAME_LENGTH} characters and email at most {MAX_EMAIL_LENGTH}'}, 400)
         
-        user = {
-            'id': len(data_store['users']) + 1,
+        created_at = datetime.utcnow().isoformat()
+        user = store.add_user({
             'name': data['name'],
             'email': data['email'],
-            'created_at': datetime.utcnow().isoformat()
-        }
+            'created_at': created_at
+        })
+        logger.info("New user created: %s", user['name'])
+        if STATIC_PAGE_DIR:
+            publish_page('users', render_users_page)
         
-        data_store['users'].append(user)
-        logger.info(f"New user created: {user['name']}")
-        
-        return jsonify({
+        return json_response({
             'message': 'User created successfully',
             'user': user
-        }), 201
+        }, 201)
 
 @app.route('/api/users/<int:user_id>', methods=['GET', 'DELETE'])
 def user_detail(user_id):
     """Get or delete a specific user"""
-    user = next((u for u in data_store['users'] if u['id'] == user_id), None)
+    user = store.get_user(user_id)
     
     if not user:
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>User Not Found</title>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                * { margin: 0; padding: 0; box-sizing: border-box; }
-                body {
-                    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                    min-height: 100vh;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    padding: 20px;
-                }
-                .container {
-                    background: rgba(255,255,255,0.95);
-                    border-radius: 24px;
-                    padding: 60px 40px;
-                    box-shadow: 0 20px 60px rgba(0,0,0,0.2);
-                    text-align: center;
-                    max-width: 500px;
-                    animation: shake 0.5s ease;
-                }
-                .error-icon {
-                    font-size: 80px;
-                    margin-bottom: 20px;
-                }
-                h1 {
-                    color: #2d3748;
-                    font-size: 32px;
-                    margin-bottom: 15px;
-                }
-                .message {
-                    color: #718096;
-                    font-size: 16px;
-                    margin-bottom: 30px;
-                }
-                .back-btn {
-                    padding: 14px 35px;
-                    background: linear-gradient(135deg, #f093fb, #f5576c);
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 12px;
-                    font-weight: 600;
-                    display: inline-block;
-                    transition: transform 0.3s ease;
-                }
-                .back-btn:hover {
-                    transform: translateY(-2px);
-                }
-                @keyframes shake {
-                    0%, 100% { transform: translateX(0); }
-                    25% { transform: translateX(-10px); }
-                    75% { transform: translateX(10px); }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="error-icon">🔍</div>
-                <h1>User Not Found</h1>
-                <p class="message">The user with ID """ + str(user_id) + """ doesn't exist in our database.</p>
-                <a href="/api/users" class="back-btn">← View All Users</a>
-            </div>
-        </body>
-        </html>
-        """
-        return render_template_string(html), 404
+        return page_template('user_not_found.html').render(user_id=user_id), 404
     
     if request.method == 'GET':
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>User Details</title>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                * { margin: 0; padding: 0; box-sizing: border-box; }
-                body {
-                    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    min-height: 100vh;
-                    padding: 40px 20px;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                }
-                .container {
-                    max-width: 600px;
-                    width: 100%;
-                }
-                .user-card {
-                    background: rgba(255,255,255,0.95);
-                    border-radius: 24px;
-                    padding: 50px;
-                    box-shadow: 0 20px 60px rgba(0,0,0,0.2);
-                    animation: fadeInScale 0.6s ease;
-                }
-                .user-avatar {
-                    width: 120px;
-                    height: 120px;
-                    background: linear-gradient(135deg, #667eea, #764ba2);
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    color: white;
-                    font-size: 48px;
-                    font-weight: 700;
-                    margin: 0 auto 30px;
-                }
-                .user-name {
-                    text-align: center;
-                    color: #2d3748;
-                    font-size: 36px;
-                    font-weight: 700;
-                    margin-bottom: 10px;
-                }
-                .user-email {
-                    text-align: center;
-                    color: #718096;
-                    font-size: 18px;
-                    margin-bottom: 40px;
-                }
-                .info-grid {
-                    display: grid;
-                    gap: 15px;
-                    margin-bottom: 30px;
-                }
-                .info-item {
-                    display: flex;
-                    justify-content: space-between;
-                    padding: 20px;
-                    background: #f7fafc;
-                    border-radius: 12px;
-                    align-items: center;
-                }
-                .info-label {
-                    color: #4a5568;
-                    font-weight: 600;
-                }
-                .info-value {
-                    color: #2d3748;
-                    font-family: 'Monaco', monospace;
-                    font-weight: 600;
-                }
-                .actions {
-                    display: flex;
-                    gap: 15px;
-                    justify-content: center;
-                }
-                .btn {
-                    padding: 14px 30px;
-                    border: none;
-                    border-radius: 12px;
-                    font-weight: 600;
-                    cursor: pointer;
-                    text-decoration: none;
-                    display: inline-block;
-                    transition: all 0.3s ease;
-                }
-                .btn-back {
-                    background: #e2e8f0;
-                    color: #2d3748;
-                }
-                .btn-back:hover {
-                    background: #cbd5e0;
-                    transform: translateY(-2px);
-                }
-                @keyframes fadeInScale {
-                    from {
-                        opacity: 0;
-                        transform: scale(0.9);
-                    }
-                    to {
-                        opacity: 1;
-                        transform: scale(1);
-                    }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="user-card">
-                    <div class="user-avatar">""" + user['name'][0].upper() + """</div>
-                    <div class="user-name">""" + user['name'] + """</div>
-                    <div class="user-email">""" + user['email'] + """</div>
-                    <div class="info-grid">
-                        <div class="info-item">
-                            <span class="info-label">User ID</span>
-                            <span class="info-value">""" + str(user['id']) + """</span>
-                        </div>
-                        <div class="info-item">
-                            <span class="info-label">Created At</span>
-                            <span class="info-value">""" + user['created_at'][:19].replace('T', ' ') + """</span>
-                        </div>
-                    </div>
-                    <div class="actions">
-                        <a href="/api/users" class="btn btn-back">← Back to Users</a>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        return render_template_string(html)
+        return page_template('user_detail.html').render(user=with_display_fields(user, user['name']))
     
     elif request.method == 'DELETE':
-        data_store['users'] = [u for u in data_store['users'] if u['id'] != user_id]
-        logger.info(f"User deleted: {user_id}")
-        return jsonify({'message': 'User deleted successfully'}), 200
+        store.delete_user(user_id)
+        logger.info("User deleted: %s", user_id)
+        if STATIC_PAGE_DIR:
+            publish_page('users', render_users_page)
+        return json_response({'message': 'User deleted successfully'})
 
 @app.route('/api/messages', methods=['GET', 'POST'])
 @require_api_key
 def messages():
     """Protected endpoint for messages"""
     if request.method == 'GET':
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Messages</title>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                * { margin: 0; padding: 0; box-sizing: border-box; }
-                body {
-                    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);
-                    min-height: 100vh;
-                    padding: 40px 20px;
-                }
-                .container {
-                    max-width: 900px;
-                    margin: 0 auto;
-                }
-                .header {
-                    text-align: center;
-                    color: white;
-                    margin-bottom: 50px;
-                    animation: fadeInDown 0.6s ease;
-                }
-                h1 {
-                    font-size: 48px;
-                    font-weight: 700;
-                    margin-bottom: 10px;
-                }
-                .subtitle {
-                    font-size: 18px;
-                    opacity: 0.95;
-                }
-                .lock-badge {
-                    display: inline-block;
-                    background: rgba(255,255,255,0.3);
-                    padding: 8px 20px;
-                    border-radius: 20px;
-                    font-size: 14px;
-                    margin-top: 10px;
-                    backdrop-filter: blur(10px);
-                }
-                .action-bar {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 30px;
-                    animation: fadeInUp 0.6s ease 0.2s both;
-                }
-                .message-count {
-                    background: rgba(255,255,255,0.95);
-                    padding: 12px 25px;
-                    border-radius: 12px;
-                    color: #2d3748;
-                    font-weight: 600;
-                }
-                .back-btn {
-                    padding: 12px 30px;
-                    background: white;
-                    color: #fa709a;
-                    text-decoration: none;
-                    border-radius: 12px;
-                    font-weight: 600;
-                    transition: all 0.3s ease;
-                }
-                .back-btn:hover {
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-                }
-                .messages-container {
-                    animation: fadeInUp 0.6s ease 0.4s both;
-                }
-                .message-card {
-                    background: rgba(255,255,255,0.95);
-                    padding: 30px;
-                    border-radius: 20px;
-                    margin-bottom: 20px;
-                    box-shadow: 0 10px 40px rgba(0,0,0,0.1);
-                    transition: transform 0.3s ease;
-                    border-left: 5px solid #fa709a;
-                }
-                .message-card:hover {
-                    transform: translateX(5px);
-                }
-                .message-header {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 15px;
-                }
-                .message-author {
-                    display: flex;
-                    align-items: center;
-                    gap: 12px;
-                }
-                .author-avatar {
-                    width: 45px;
-                    height: 45px;
-                    background: linear-gradient(135deg, #fa709a, #fee140);
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    color: white;
-                    font-weight: 700;
-                    font-size: 18px;
-                }
-                .author-name {
-                    color: #2d3748;
-                    font-weight: 700;
-                    font-size: 18px;
-                }
-                .message-date {
-                    color: #a0aec0;
-                    font-size: 13px;
-                }
-                .message-content {
-                    color: #4a5568;
-                    line-height: 1.6;
-                    font-size: 16px;
-                }
-                .empty-state {
-                    text-align: center;
-                    padding: 80px 20px;
-                    background: rgba(255,255,255,0.95);
-                    border-radius: 20px;
-                }
-                .empty-icon {
-                    font-size: 80px;
-                    margin-bottom: 20px;
-                    opacity: 0.5;
-                }
-                .empty-text {
-                    color: #4a5568;
-                    font-size: 18px;
-                }
-                @keyframes fadeInDown {
-                    from { opacity: 0; transform: translateY(-30px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-                @keyframes fadeInUp {
-                    from { opacity: 0; transform: translateY(30px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>💬 Messages</h1>
-                    <p class="subtitle">Protected message board</p>
-                    <div class="lock-badge">🔐 API Key Required</div>
-                </div>
-                <div class="action-bar">
-                    <div class="message-count">Total Messages: """ + str(len(data_store['messages'])) + """</div>
-                    <a href="/" class="back-btn">← Back to Home</a>
-                </div>
-                <div class="messages-container">
-                """ + ("""
-                """ + ''.join([f"""
-                    <div class="message-card">
-                        <div class="message-header">
-                            <div class="message-author">
-                                <div class="author-avatar">{msg['author'][0].upper()}</div>
-                                <div>
-                                    <div class="author-name">{msg['author']}</div>
-                                    <div class="message-date">{msg['created_at'][:19].replace('T', ' ')}</div>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="message-content">{msg['content']}</div>
-                    </div>
-                """ for msg in reversed(data_store['messages'])]) + """
-                """ if data_store['messages'] else """
-                <div class="empty-state">
-                    <div class="empty-icon">📭</div>
-                    <div class="empty-text">No messages yet</div>
-                    <p style="color: #718096; margin-top: 10px;">Post your first message using the POST /api/messages endpoint</p>
-                </div>
-                """) + """
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        return render_template_string(html)
+        return versioned_page('messages', render_messages_page)
     
     elif request.method == 'POST':
         data = request.get_json()
         
         if not data or 'content' not in data:
-            return jsonify({'error': 'Content is required'}), 400
+            return json_response({'error': 'Content is required'}, 400)
+
+        author = data.get('author', 'Anonymous')
+        if not isinstance(data['content'], str) or not isinstance(author, str):
+            return json_response({'error': 'Content and author must be strings'}, 400)
         
-        message = {
-            'id': len(data_store['messages']) + 1,
+        created_at = datetime.utcnow().isoformat()
+        message = store.add_message({
             'content': data['content'],
-            'author': data.get('author', 'Anonymous'),
-            'created_at': datetime.utcnow().isoformat()
-        }
-        
-        data_store['messages'].append(message)
-        logger.info(f"New message posted by {message['author']}")
+            'author': author,
+            'created_at': created_at
+        })
+        logger.info("New message posted by %s", message['author'])
         
-        return jsonify({
+        return json_response({
             'message': 'Message posted successfully',
             'data': message
-        }), 201
+        }, 201)
 
 @app.route('/api/search', methods=['GET'])
 def search():
     """Search users by name"""
     query = request.args.get('q', '').lower()
+
+    if wants_json():
+        return json_response({'query': query, 'results': store.search_users(query) if query else []})
     
     if not query:
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Search Users</title>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                * { margin: 0; padding: 0; box-sizing: border-box; }
-                body {
-                    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    background: linear-gradient(135deg, #30cfd0 0%, #330867 100%);
-                    min-height: 100vh;
-                    padding: 40px 20px;
-                }
-                .container {
-                    max-width: 800px;
-                    margin: 0 auto;
-                }
-                .header {
-                    text-align: center;
-                    color: white;
-                    margin-bottom: 50px;
-                    animation: fadeInDown 0.6s ease;
-                }
-                h1 {
-                    font-size: 48px;
-                    font-weight: 700;
-                    margin-bottom: 10px;
-                }
-                .subtitle {
-                    font-size: 18px;
-                    opacity: 0.95;
-                }
-                .search-card {
-                    background: rgba(255,255,255,0.95);
-                    padding: 50px;
-                    border-radius: 24px;
-                    box-shadow: 0 20px 60px rgba(0,0,0,0.2);
-                    text-align: center;
-                    animation: fadeInUp 0.6s ease 0.2s both;
-                }
-                .search-icon {
-                    font-size: 80px;
-                    margin-bottom: 30px;
-                }
-                .search-form {
-                    margin-bottom: 30px;
-                }
-                .search-input {
-                    width: 100%;
-                    padding: 18px 25px;
-                    font-size: 18px;
-                    border: 2px solid #e2e8f0;
-                    border-radius: 12px;
-                    transition: all 0.3s ease;
-                    font-family: inherit;
-                }
-                .search-input:focus {
-                    outline: none;
-                    border-color: #30cfd0;
-                    box-shadow: 0 0 0 3px rgba(48, 207, 208, 0.1);
-                }
-                .search-btn {
-                    width: 100%;
-                    margin-top: 15px;
-                    padding: 16px;
-                    background: linear-gradient(135deg, #30cfd0, #330867);
-                    color: white;
-                    border: none;
-                    border-radius: 12px;
-                    font-size: 16px;
-                    font-weight: 600;
-                    cursor: pointer;
-                    transition: transform 0.3s ease;
-                }
-                .search-btn:hover {
-                    transform: translateY(-2px);
-                }
-                .info-text {
-                    color: #718096;
-                    font-size: 14px;
-                    margin-bottom: 20px;
-                }
-                .back-btn {
-                    padding: 14px 35px;
-                    background: #e2e8f0;
-                    color: #2d3748;
-                    text-decoration: none;
-                    border-radius: 12px;
-                    font-weight: 600;
-                    display: inline-block;
-                    transition: all 0.3s ease;
-                }
-                .back-btn:hover {
-                    background: #cbd5e0;
-                    transform: translateY(-2px);
-                }
-                @keyframes fadeInDown {
-                    from { opacity: 0; transform: translateY(-30px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-                @keyframes fadeInUp {
-                    from { opacity: 0; transform: translateY(30px); }
-                    to { opacity: 1; transform: translateY(0); }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🔍 Search Users</h1>
-                    <p class="subtitle">Find users by name</p>
-                </div>
-                <div class="search-card">
-                    <div class="search-icon">🔎</div>
-                    <form class="search-form" method="GET">
-                        <input type="text" name="q" class="search-input" placeholder="Enter user name..." autofocus>
-                        <button type="submit" class="search-btn">Search</button>
-                    </form>
-                    <p class="info-text">Enter a name to search through all registered users</p>
-                    <a href="/" class="back-btn">← Back to Home</a>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        return render_template_string(html)
-    
-    results = [u for u in data_store['users'] if query in u['name'].lower()]
-    
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Search Results</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body {
-                font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                background: linear-gradient(135deg, #30cfd0 0%, #330867 100%);
-                min-height: 100vh;
-                padding: 40px 20px;
-            }
-            .container {
-                max-width: 1000px;
-                margin: 0 auto;
-            }
-            .header {
-                text-align: center;
-                color: white;
-                margin-bottom: 50px;
-                animation: fadeInDown 0.6s ease;
-            }
-            h1 {
-                font-size: 48px;
-                font-weight: 700;
-                margin-bottom: 10px;
-            }
-            .search-query {
-                background: rgba(255,255,255,0.2);
-                padding: 8px 20px;
-                border-radius: 20px;
-                display: inline-block;
-                margin-top: 10px;
-                backdrop-filter: blur(10px);
-            }
-            .results-header {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin-bottom: 30px;
-                animation: fadeInUp 0.6s ease 0.2s both;
-            }
-            .result-count {
-                background: rgba(255,255,255,0.95);
-                padding: 12px 25px;
-                border-radius: 12px;
-                color: #2d3748;
-                font-weight: 600;
-            }
-            .back-btn {
-                padding: 12px 30px;
-                background: white;
-                color: #30cfd0;
-                text-decoration: none;
-                border-radius: 12px;
-                font-weight: 600;
-                transition: all 0.3s ease;
-            }
-            .back-btn:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-            }
-            .results-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-                gap: 25px;
-                animation: fadeInUp 0.6s ease 0.4s both;
-            }
-            .user-card {
-                background: rgba(255,255,255,0.95);
-                padding: 30px;
-                border-radius: 20px;
-                box-shadow: 0 10px 40px rgba(0,0,0,0.15);
-                transition: transform 0.3s ease;
-            }
-            .user-card:hover {
-                transform: translateY(-5px);
-            }
-            .user-avatar {
-                width: 60px;
-                height: 60px;
-                background: linear-gradient(135deg, #30cfd0, #330867);
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                color: white;
-                font-size: 24px;
-                font-weight: 700;
-                margin-bottom: 20px;
-            }
-            .user-name {
-                color: #2d3748;
-                font-size: 20px;
-                font-weight: 700;
-                margin-bottom: 8px;
-            }
-            .user-email {
-                color: #718096;
-                font-size: 14px;
-            }
-            .empty-state {
-                text-align: center;
-                padding: 80px 20px;
-                background: rgba(255,255,255,0.95);
-                border-radius: 20px;
-                animation: fadeInUp 0.6s ease 0.4s both;
-            }
-            .empty-icon {
-                font-size: 80px;
-                margin-bottom: 20px;
-                opacity: 0.5;
-            }
-            .empty-text {
-                color: #4a5568;
-                font-size: 18px;
-                margin-bottom: 15px;
-            }
-            @keyframes fadeInDown {
-                from { opacity: 0; transform: translateY(-30px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-            @keyframes fadeInUp {
-                from { opacity: 0; transform: translateY(30px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🔍 Search Results</h1>
-                <div class="search-query">Query: """ + query + """</div>
-            </div>
-            <div class="results-header">
-                <div class="result-count">Found """ + str(len(results)) + """ result(s)</div>
-                <a href="/api/search" class="back-btn">← New Search</a>
-            </div>
-            """ + ("""
-            <div class="results-grid">
-            """ + ''.join([f"""
-                <div class="user-card">
-                    <div class="user-avatar">{user['name'][0].upper()}</div>
-                    <div class="user-name">{user['name']}</div>
-                    <div class="user-email">{user['email']}</div>
-                </div>
-            """ for user in results]) + """
-            </div>
-            """ if results else """
-            <div class="empty-state">
-                <div class="empty-icon">😕</div>
-                <div class="empty-text">No users found</div>
-                <p style="color: #718096;">Try searching with a different name</p>
-            </div>
-            """) + """
-        </div>
-    </body>
-    </html>
-    """
+        return static_page('search.html')
     
-    return render_template_string(html)
+    # Keyed on the users revision, so any user write retires every cached result
+    key = f"search:{store.get_revision('users')}:{hashlib.sha1(query.encode()).hexdigest()}"
+    # Skipped while templates auto-reload (debug), so template edits show at once
+    body = None if app.jinja_env.auto_reload else store.cache_get(key)
+    if body is None:
+        body = render_listing('search_results', 'results', store.search_users(query), query=query).encode()
+        store.cache_set(key, body, SEARCH_CACHE_TTL)
+    return compressed_response(body, hashlib.sha1(body).digest())
+
+# Replace any users page left over from a previous run
+if STATIC_PAGE_DIR:
+    os.makedirs(STATIC_PAGE_DIR, exist_ok=True)
+    publish_page('users', render_users_page, force=True)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
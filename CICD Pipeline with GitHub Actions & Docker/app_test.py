@@ -1,9 +1,16 @@
+import brotli
+import gzip
+import re
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
 import pytest
-from app import app as flask_app
+import app as app_module
+from app import app as flask_app, render_health
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def client():
-    """Create a test client for the Flask app."""
+    """Create one test client for the Flask app, shared by every test."""
+    flask_app.config['TESTING'] = True
     with flask_app.test_client() as client:
         yield client
 
@@ -12,3 +19,225 @@ def test_hello_page(client):
     response = client.get('/')
     assert response.status_code == 200
     assert b"Hello, World!" in response.data
+
+def test_not_found_returns_json(client):
+    """Test that unknown routes return the JSON error body."""
+    response = client.get('/does-not-exist')
+    assert response.status_code == 404
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'error': 'Resource not found', 'status': 404}
+
+def test_create_user(client):
+    """Test that POST /api/users echoes the created user as JSON."""
+    response = client.post('/api/users', json={'name': 'Ada', 'email': 'ada@example.com'})
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['user']['name'] == 'Ada'
+    assert data['user']['email'] == 'ada@example.com'
+
+def test_security_headers(client):
+    """Test that every response carries the security and CORS headers once."""
+    response = client.get('/api/health')
+    assert response.headers.getlist('X-Frame-Options') == ['DENY']
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+
+def test_messages_require_api_key(client):
+    """Test that /api/messages rejects a missing or wrong API key."""
+    assert client.get('/api/messages').status_code == 401
+    response = client.get('/api/messages', headers={'X-API-Key': 'wrong'})
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Invalid or missing API key'}
+    assert client.get('/api/messages', headers={'X-API-Key': 'demo-api-key'}).status_code == 200
+
+def test_json_dates_match_flask(client):
+    """Test that dates are serialized as HTTP dates, as Flask's own JSON provider does."""
+    value = {'at': datetime(2024, 5, 1, 12, 30), 'on': date(2024, 5, 1)}
+    assert flask_app.json.loads(flask_app.json.dumps(value)) == flask_app.json.loads(DefaultJSONProvider(flask_app).dumps(value))
+
+def test_health_json(client):
+    """Test that /api/health returns JSON when the client asks for it."""
+    response = client.get('/api/health', headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'healthy'
+    assert b'<html>' in client.get('/api/health').data
+
+def test_stats_page_gzip(client):
+    """Test that the stats page is gzipped for clients that accept it."""
+    response = client.get('/api/stats', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'Statistics' in gzip.decompress(response.data)
+    assert 'Content-Encoding' not in client.get('/api/stats').headers
+    response = client.get('/api/stats', headers={'Accept-Encoding': 'gzip;q=0, br'})
+    assert response.headers.get('Content-Encoding') != 'gzip'
+
+def test_users_page_compressed(client):
+    """Test that the users page is compressed, preferring Brotli."""
+    response = client.get('/api/users', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    response.close()
+    response = client.get('/api/users', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'</html>' in gzip.decompress(response.data)
+
+def test_cached_pages_compressed_once(client, monkeypatch):
+    """Test that a cached page is Brotli-compressed once and the stored bytes are reused."""
+    calls = []
+    compress = brotli.compress
+    monkeypatch.setattr('brotli.compress', lambda *args, **kwargs: calls.append(1) or compress(*args, **kwargs))
+    client.get('/api/users').data
+    first = client.get('/api/users', headers={'Accept-Encoding': 'br'})
+    second = client.get('/api/users', headers={'Accept-Encoding': 'br'})
+    assert first.headers['Content-Encoding'] == 'br'
+    assert first.data == second.data
+    assert brotli.decompress(first.data) == client.get('/api/users').data
+    assert len(calls) <= 1
+
+def test_stylesheet_gzipped(client):
+    """Test that stylesheets are gzipped for clients without Brotli."""
+    response = client.get('/static/css/users.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'.user-card' in gzip.decompress(response.data)
+    response.close()
+
+def test_list_users_json(client):
+    """Test that GET /api/users returns JSON when the client asks for it."""
+    client.post('/api/users', json={'name': 'Grace', 'email': 'grace@example.com'})
+    response = client.get('/api/users', headers={'Accept': 'application/json'})
+    assert response.mimetype == 'application/json'
+    assert 'Grace' in [u['name'] for u in response.get_json()]
+    assert set(response.get_json()[-1]) == {'id', 'name', 'email', 'created_at'}
+
+def test_users_page_follows_writes(client):
+    """Test that the cached users page is rendered again after users are added or deleted."""
+    client.get('/api/users')
+    user_id = client.post('/api/users', json={'name': 'Margaret', 'email': 'margaret@example.com'}).get_json()['user']['id']
+    assert b'Margaret' in client.get('/api/users').data
+    client.delete(f'/api/users/{user_id}')
+    assert b'Margaret' not in client.get('/api/users').data
+
+def test_users_page_streamed_after_write(client):
+    """Test that the users page is streamed after a write and served whole, with an ETag, after that."""
+    client.post('/api/users', json={'name': 'Leslie', 'email': 'leslie@example.com'})
+    streamed = client.get('/api/users')
+    assert 'ETag' not in streamed.headers
+    assert 'Content-Length' not in streamed.headers
+    body = streamed.data
+    cached = client.get('/api/users')
+    assert cached.data == body
+    assert cached.headers['ETag']
+
+def test_users_page_not_modified(client):
+    """Test that a repeat GET with the page's ETag gets an empty 304 until the users change."""
+    client.get('/api/users').data
+    etag = client.get('/api/users').headers['ETag']
+    response = client.get('/api/users', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    client.post('/api/users', json={'name': 'Edsger', 'email': 'edsger@example.com'})
+    assert client.get('/api/users', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/users', headers={'If-None-Match': '"users-0"'}).status_code == 200
+
+def test_users_page_published(client, monkeypatch, tmp_path):
+    """Test that user writes rewrite the users page in STATIC_PAGE_DIR."""
+    monkeypatch.setattr('app.STATIC_PAGE_DIR', str(tmp_path))
+    user_id = client.post('/api/users', json={'name': 'Barbara', 'email': 'barbara@example.com'}).get_json()['user']['id']
+    page = tmp_path / 'users.html'
+    assert b'Barbara' in page.read_bytes()
+    assert page.read_bytes() == client.get('/api/users').data
+    client.delete(f'/api/users/{user_id}')
+    assert b'Barbara' not in page.read_bytes()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['users.html', 'users.html.rev']
+
+def test_users_page_publish_keeps_newer_page(client, monkeypatch, tmp_path):
+    """Test that an older render does not replace a newer published page, and that a failed write is not an error."""
+    monkeypatch.setattr('app.STATIC_PAGE_DIR', str(tmp_path))
+    (tmp_path / 'users.html').write_bytes(b'newer')
+    (tmp_path / 'users.html.rev').write_text('1000000')
+    assert client.post('/api/users', json={'name': 'Donald', 'email': 'donald@example.com'}).status_code == 201
+    assert (tmp_path / 'users.html').read_bytes() == b'newer'
+    monkeypatch.setattr('app.STATIC_PAGE_DIR', str(tmp_path / 'missing'))
+    assert client.post('/api/users', json={'name': 'Niklaus', 'email': 'niklaus@example.com'}).status_code == 201
+
+def test_search_results_follow_writes(client):
+    """Test that cached search results are dropped once users change."""
+    assert b'Alan' not in client.get('/api/search', query_string={'q': 'alan'}).data
+    client.post('/api/users', json={'name': 'Alan', 'email': 'alan@example.com'})
+    assert b'Alan' in client.get('/api/search', query_string={'q': 'alan'}).data
+
+def test_search_card_follows_template_edits(client, monkeypatch):
+    """Test that search cards are not served from the cache while templates auto-reload."""
+    client.post('/api/users', json={'name': 'Grace', 'email': 'grace@example.com'})
+    assert b'Grace' in client.get('/api/search', query_string={'q': 'grace'}).data
+    edited = flask_app.jinja_env.from_string('<p class="edited">{{ name }}</p>')
+    page_template = app_module.page_template
+    monkeypatch.setattr(flask_app.jinja_env, 'auto_reload', True)
+    monkeypatch.setattr(app_module, 'page_template', lambda name: edited if name == 'search_card.html' else page_template(name))
+    assert b'<p class="edited">Grace</p>' in client.get('/api/search', query_string={'q': 'grace'}).data
+
+def test_search_json(client):
+    """Test that /api/search returns the matching users as JSON when the client asks for it."""
+    client.post('/api/users', json={'name': 'Katherine', 'email': 'katherine@example.com'})
+    response = client.get('/api/search', query_string={'q': 'KATH'}, headers={'Accept': 'application/json'})
+    assert response.mimetype == 'application/json'
+    data = response.get_json()
+    assert data['query'] == 'kath'
+    assert 'Katherine' in [u['name'] for u in data['results']]
+
+def test_page_stylesheet_is_cacheable(client):
+    """Test that the users page links its stylesheets by content hash and they are served with a long max-age."""
+    page = client.get('/api/users').data.decode()
+    assert re.search(r'href="/static/css/base\.css\?v=[0-9a-f]{8}"', page)
+    assert re.search(r'href="/static/css/users\.css\?v=[0-9a-f]{8}"', page)
+    response = client.get('/static/css/users.css')
+    assert response.status_code == 200
+    assert response.cache_control.max_age == 31536000
+    response.close()
+
+def test_page_stylesheet_versioned_with_auto_reload(client, monkeypatch):
+    """Test that stylesheet hashes are taken from disk while templates auto-reload."""
+    monkeypatch.setattr(flask_app.jinja_env, 'auto_reload', True)
+    page = client.get('/api/users').data.decode()
+    assert re.search(r'href="/static/css/users\.css\?v=[0-9a-f]{8}"', page)
+
+def test_user_values_are_escaped(client):
+    """Test that user-supplied values are HTML-escaped on every page."""
+    payload = '<script>alert(1)</script>'
+    user_id = client.post('/api/users', json={'name': payload, 'email': payload}).get_json()['user']['id']
+    client.post('/api/messages', json={'content': payload, 'author': payload}, headers={'X-API-Key': 'demo-api-key'})
+    pages = [
+        client.get('/api/users'),
+        client.get(f'/api/users/{user_id}'),
+        client.get('/api/messages', headers={'X-API-Key': 'demo-api-key'}),
+        client.get('/api/search', query_string={'q': payload}),
+    ]
+    for response in pages:
+        assert b'<script>' not in response.data
+        assert b'&lt;script&gt;' in response.data
+
+def test_health_page_script_is_not_closed_early(monkeypatch):
+    """Test that values embedded in the health page script cannot end the script element."""
+    monkeypatch.setattr('app.ENVIRONMENT', '</script><script>alert(1)</script>')
+    page = render_health()
+    assert page.count(b'</script>') == 1
+    assert b'<\\/script><script>alert(1)<\\/script>' in page
+
+def test_create_user_rejects_overlong_fields(client):
+    """Test that overlong names and emails are rejected with a 400."""
+    response = client.post('/api/users', json={'name': 'x' * 101, 'email': 'a@example.com'})
+    assert response.status_code == 400
+    response = client.post('/api/users', json={'name': 'Ada', 'email': 'x' * 255})
+    assert response.status_code == 400
+
+def test_non_string_fields_rejected(client):
+    """Test that non-string user and message fields are rejected with a 400."""
+    assert client.post('/api/users', json={'name': 123, 'email': 'x'}).status_code == 400
+    assert client.post('/api/users', json={'name': 'Ada', 'email': ['x']}).status_code == 400
+    headers = {'X-API-Key': 'demo-api-key'}
+    assert client.post('/api/messages', json={'content': 1}, headers=headers).status_code == 400
+    assert client.post('/api/messages', json={'content': 'hi', 'author': None}, headers=headers).status_code == 400
+
+def test_negotiated_routes_vary_on_accept(client):
+    """Test that routes serving HTML or JSON from one URL send Vary: Accept on both."""
+    for path in ['/api/health', '/api/users', '/api/search?q=a']:
+        assert 'Accept' in client.get(path).vary
+        assert 'Accept' in client.get(path, headers={'Accept': 'application/json'}).vary
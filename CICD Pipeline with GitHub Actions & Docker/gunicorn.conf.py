@@ -0,0 +1,25 @@
+# Gunicorn settings, picked up automatically from the working directory
+import multiprocessing
+import os
+
+# The app is imported once in the master and shared with the forked workers,
+# so patch for gevent before it is loaded rather than in each worker
+from gevent import monkey
+monkey.patch_all()
+
+wsgi_app = 'wsgi:application'
+preload_app = True
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# gevent workers patch the stdlib at startup, so socket I/O (clients, Redis)
+# yields to other greenlets instead of blocking the worker
+worker_class = 'gevent'
+worker_connections = 2000
+keepalive = 5
+
+# Without Redis every worker keeps its own data, so stay on a single worker
+if os.environ.get('REDIS_URL'):
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+else:
+    workers = 1
@@ -0,0 +1,279 @@
+"""Storage backends for the Flask API.
+
+The in-memory store is used by default. Setting REDIS_URL switches to Redis
+so counters, users, messages and cached pages are shared by every worker
+and survive restarts.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import orjson
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class MemoryStore:
+    """Process-local store (one copy per worker)
+
+    Users are kept in a dict keyed by id (insertion ordered), so lookups and
+    deletes are O(1) and listings take a snapshot of its values.
+    Lowercased names are cached per user id and indexed by trigram, so a
+    search intersects a few posting sets instead of scanning every user.
+    Each collection has a revision that moves on every write.
+    """
+
+    # Cache entries kept before expired ones are dropped
+    CACHE_SIZE = 1024
+
+    def __init__(self):
+        self.visits = 0
+        self.users = {}
+        self._names_lower = {}
+        self._trigram_index = {}
+        self.messages = deque()
+        self._next_user_id = 1
+        self._next_message_id = 1
+        self._cache = {}
+        self._revisions = {'users': 0, 'messages': 0}
+
+    def incr_visits(self):
+        self.visits += 1
+
+    def get_counts(self):
+        """Return (visits, users, messages)"""
+        return self.visits, len(self.users), len(self.messages)
+
+    def get_revision(self, collection):
+        return self._revisions[collection]
+
+    def add_user(self, user):
+        user = {'id': self._next_user_id, **user}
+        self._next_user_id += 1
+        self.users[user['id']] = user
+        name_lower = self._names_lower[user['id']] = user['name'].lower()
+        for trigram in _trigrams(name_lower):
+            self._trigram_index.setdefault(trigram, set()).add(user['id'])
+        self._revisions['users'] += 1
+        return user
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    def delete_user(self, user_id):
+        if self.users.pop(user_id, None) is None:
+            return
+        for trigram in _trigrams(self._names_lower.pop(user_id)):
+            ids = self._trigram_index[trigram]
+            ids.discard(user_id)
+            if not ids:
+                del self._trigram_index[trigram]
+        self._revisions['users'] += 1
+
+    def list_users(self):
+        return tuple(self.users.values())
+
+    def users_json(self):
+        return orjson.dumps(self.list_users())
+
+    def search_users(self, query):
+        query_trigrams = _trigrams(query)
+        if query_trigrams:
+            postings = sorted((self._trigram_index.get(t, set()) for t in query_trigrams), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            candidates = self._names_lower
+        names = self._names_lower
+        return [self.users[i] for i in sorted(candidates) if query in names[i]]
+
+    def add_message(self, message):
+        message = {'id': self._next_message_id, **message}
+        self._next_message_id += 1
+        self.messages.appendleft(message)
+        self._revisions['messages'] += 1
+        return message
+
+    def list_messages(self):
+        """Return a snapshot of the messages, newest first"""
+        return tuple(self.messages)
+
+    def cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def cache_set(self, key, value, ttl):
+        now = time.monotonic()
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache = {k: e for k, e in self._cache.items() if e[1] >= now}
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+        self._cache[key] = (value, now + ttl)
+
+
+# Characters of each name suffix kept in the Redis name index
+NAME_INDEX_WIDTH = 32
+
+
+def _name_index_members(user):
+    """Index entries for every suffix of the lowercased name, cut to NAME_INDEX_WIDTH
+
+    A prefix range over suffixes matches any substring of the name, so
+    ZRANGEBYLEX can answer the same queries as a substring scan. Cutting the
+    suffixes keeps the index linear in the name length; longer queries are
+    looked up by their first NAME_INDEX_WIDTH characters and confirmed
+    against the full name.
+    """
+    name = user['name'].lower()
+    tail = b'\x00' + str(user['id']).encode()
+    return list(dict.fromkeys(name[i:i + NAME_INDEX_WIDTH].encode() + tail for i in range(len(name))))
+
+
+class RedisStore:
+    """Store shared through a Redis server
+
+    Users and messages are kept as lists of orjson-encoded records (messages
+    newest first), ids come from INCR so they stay unique across workers. Users are also stored in
+    the users:by_id hash and indexed by name in the users:name_index
+    sorted set, so lookups and searches never walk the whole list. Every
+    write also INCRs <collection>:rev, giving all workers the same revision.
+
+    Visits are counted locally and added to Redis with one INCRBY per
+    flush_interval by a background thread, keeping Redis off the request path.
+
+    A worker runs many greenlets but holds at most max_connections
+    connections; once they are all in use a command waits up to
+    pool_timeout seconds for one to be released instead of failing.
+    """
+
+    def __init__(self, url, flush_interval=1.0, max_connections=50, pool_timeout=10):
+        pool = redis.BlockingConnectionPool.from_url(url, max_connections=max_connections, timeout=pool_timeout)
+        self.redis = redis.Redis(connection_pool=pool)
+        self.flush_interval = flush_interval
+        self._pending_visits = 0
+        self._visits_lock = threading.Lock()
+        self._flusher_pid = None
+
+    def incr_visits(self):
+        # Started lazily (and again after a fork) so each worker runs its own flusher
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+        with self._visits_lock:
+            self._pending_visits += 1
+
+    def get_counts(self):
+        """Return (visits, users, messages) in a single round trip"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get('visits')
+        pipe.llen('users')
+        pipe.llen('messages')
+        visits, users, messages = pipe.execute()
+        return int(visits or 0) + self._pending_visits, users, messages
+
+    def get_revision(self, collection):
+        return int(self.redis.get(f'{collection}:rev') or 0)
+
+    def flush_visits(self):
+        with self._visits_lock:
+            pending, self._pending_visits = self._pending_visits, 0
+        if not pending:
+            return
+        try:
+            self.redis.incrby('visits', pending)
+        except redis.RedisError:
+            logger.warning("Could not flush %d visits to Redis, retrying later", pending)
+            with self._visits_lock:
+                self._pending_visits += pending
+
+    def _start_flusher(self):
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, daemon=True).start()
+        atexit.register(self.flush_visits)
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush_visits()
+
+    def add_user(self, user):
+        user = {'id': self.redis.incr('users:next_id'), **user}
+        blob = orjson.dumps(user)
+        pipe = self.redis.pipeline()
+        pipe.rpush('users', blob)
+        pipe.hset('users:by_id', user['id'], blob)
+        pipe.zadd('users:name_index', dict.fromkeys(_name_index_members(user), 0))
+        pipe.incr('users:rev')
+        pipe.execute()
+        return user
+
+    def get_user(self, user_id):
+        blob = self.redis.hget('users:by_id', user_id)
+        return orjson.loads(blob) if blob else None
+
+    def delete_user(self, user_id):
+        blob = self.redis.hget('users:by_id', user_id)
+        if blob is None:
+            return
+        pipe = self.redis.pipeline()
+        pipe.lrem('users', 1, blob)
+        pipe.hdel('users:by_id', user_id)
+        pipe.zrem('users:name_index', *_name_index_members(orjson.loads(blob)))
+        pipe.incr('users:rev')
+        pipe.execute()
+
+    def list_users(self):
+        return [orjson.loads(blob) for blob in self.redis.lrange('users', 0, -1)]
+
+    def users_json(self):
+        # Records are stored encoded, so the array is spliced without decoding
+        # them; the brackets go on the end records so only one join copies the list
+        blobs = self.redis.lrange('users', 0, -1)
+        if not blobs:
+            return b'[]'
+        blobs[0] = b'[' + blobs[0]
+        blobs[-1] += b']'
+        return b','.join(blobs)
+
+    def search_users(self, query):
+        prefix = query[:NAME_INDEX_WIDTH].encode()
+        members = self.redis.zrangebylex('users:name_index', b'[' + prefix, b'[' + prefix + b'\xff')
+        ids = sorted({int(m.rpartition(b'\x00')[2]) for m in members})
+        if not ids:
+            return []
+        users = (orjson.loads(blob) for blob in self.redis.hmget('users:by_id', ids) if blob)
+        return [user for user in users if query in user['name'].lower()]
+
+    def add_message(self, message):
+        message = {'id': self.redis.incr('messages:next_id'), **message}
+        pipe = self.redis.pipeline()
+        pipe.lpush('messages', orjson.dumps(message))
+        pipe.incr('messages:rev')
+        pipe.execute()
+        return message
+
+    def list_messages(self):
+        """Return messages newest first"""
+        return [orjson.loads(blob) for blob in self.redis.lrange('messages', 0, -1)]
+
+    def cache_get(self, key):
+        return self.redis.get(key)
+
+    def cache_set(self, key, value, ttl):
+        if ttl > 0:
+            self.redis.set(key, value, ex=ttl, nx=True)
+
+
+def create_store(redis_url=None):
+    """Return a RedisStore when a URL is given, otherwise a MemoryStore"""
+    if redis_url:
+        return RedisStore(redis_url)
+    return MemoryStore()
@@ -0,0 +1,100 @@
+import fakeredis
+import orjson
+import pytest
+import redis
+from store import MemoryStore, RedisStore
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request, monkeypatch):
+    """Create an empty store for each backend (Redis is faked in-process)."""
+    if request.param == 'memory':
+        return MemoryStore()
+    monkeypatch.setattr('redis.Redis', lambda connection_pool: fakeredis.FakeRedis())
+    return RedisStore('redis://localhost')
+
+def add_user(store, name):
+    return store.add_user({'name': name, 'email': f'{name}@example.com', 'created_at': '2024-01-01T00:00:00'})
+
+def test_search_matches_substrings(store):
+    """Test that search finds users by any part of their name."""
+    add_user(store, 'Ada')
+    add_user(store, 'Adalbert')
+    add_user(store, 'Bob')
+    assert [u['name'] for u in store.search_users('ada')] == ['Ada', 'Adalbert']
+    assert [u['name'] for u in store.search_users('ber')] == ['Adalbert']
+    assert store.search_users('zed') == []
+
+def test_delete_user_removes_it_everywhere(store):
+    """Test that a deleted user is gone from lookups, listings and search."""
+    ada = add_user(store, 'Ada')
+    bob = add_user(store, 'Bob')
+    store.delete_user(ada['id'])
+    assert store.get_user(ada['id']) is None
+    assert store.get_user(bob['id'])['name'] == 'Bob'
+    assert [u['name'] for u in store.list_users()] == ['Bob']
+    assert store.search_users('ada') == []
+
+def test_ids_are_not_reused_after_delete(store):
+    """Test that new users never get the id of a deleted one."""
+    add_user(store, 'Ada')
+    bob = add_user(store, 'Bob')
+    store.delete_user(bob['id'])
+    assert add_user(store, 'Cy')['id'] == bob['id'] + 1
+
+def test_visits_are_counted(store):
+    """Test that visits add up, including ones not yet flushed to Redis."""
+    for _ in range(3):
+        store.incr_visits()
+    add_user(store, 'Ada')
+    assert store.get_counts() == (3, 1, 0)
+    if isinstance(store, RedisStore):
+        store.flush_visits()
+        assert int(store.redis.get('visits')) == 3
+        assert store.get_counts() == (3, 1, 0)
+
+def test_users_json(store):
+    """Test that users_json returns every user as a JSON array."""
+    assert orjson.loads(store.users_json()) == []
+    add_user(store, 'Ada')
+    add_user(store, 'Bob')
+    assert [u['name'] for u in orjson.loads(store.users_json())] == ['Ada', 'Bob']
+
+def test_messages_newest_first(store):
+    """Test that messages are listed newest first."""
+    store.add_message({'content': 'first', 'author': 'Ada', 'created_at': '2024-01-01T00:00:00'})
+    store.add_message({'content': 'second', 'author': 'Bob', 'created_at': '2024-01-01T00:00:01'})
+    assert [m['content'] for m in store.list_messages()] == ['second', 'first']
+
+def test_revisions_move_on_writes(store):
+    """Test that each collection's revision changes on every write to it."""
+    assert store.get_revision('users') == store.get_revision('messages') == 0
+    ada = add_user(store, 'Ada')
+    store.delete_user(ada['id'])
+    store.delete_user(ada['id'])
+    assert store.get_revision('users') == 2
+    store.add_message({'content': 'hi', 'author': 'Ada', 'created_at': '2024-01-01T00:00:00'})
+    assert store.get_revision('messages') == 1
+    assert store.get_revision('users') == 2
+
+def test_memory_cache_is_bounded(monkeypatch):
+    """Test that the in-memory cache stops growing once it holds CACHE_SIZE entries."""
+    store = MemoryStore()
+    monkeypatch.setattr(store, 'CACHE_SIZE', 4)
+    for i in range(10):
+        store.cache_set(f'key{i}', b'value', 60)
+    assert len(store._cache) <= 4
+    assert store.cache_get('key9') == b'value'
+
+def test_search_long_names(store):
+    """Test that names and queries longer than the Redis index width are still matched exactly."""
+    name = 'Ada ' + 'x' * 40 + ' Lovelace'
+    add_user(store, name)
+    add_user(store, 'Ada ' + 'x' * 40 + ' Byron')
+    assert [u['name'] for u in store.search_users(('x' * 40 + ' love').lower())] == [name]
+
+def test_redis_pool_waits_for_connections():
+    """Test that the Redis store queues commands for a free connection instead of failing."""
+    store = RedisStore('redis://localhost', max_connections=5)
+    pool = store.redis.connection_pool
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == 5